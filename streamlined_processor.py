@@ -6,21 +6,40 @@ This tool downloads images from the database and replaces old logos with new one
 It cleans up old data before each run.
 """
 
+import io
 import os
+import hashlib
 import shutil
 import logging
+import threading
+from functools import lru_cache
 import numpy as np
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from itertools import islice
 from pathlib import Path
 from typing import List, Tuple, Optional
+from urllib.parse import urlparse
 import mysql.connector
+import mysql.connector.pooling
 import requests
+import requests.adapters
 import json
 from PIL import Image
 import cv2
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config as BotocoreConfig
 from botocore.exceptions import ClientError
 from dotenv import load_dotenv
 
+# orjson parses section content much faster; fall back to the stdlib if missing.
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so handlers work with both.
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
 # Load environment variables
 load_dotenv()
 
@@ -34,10 +53,81 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Image file extensions that are downloaded and uploaded
+_IMAGE_EXTS = frozenset({'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp'})
+
+# Content-Type sent to S3 for each image extension
+_CONTENT_TYPES = {
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.png': 'image/png',
+    '.gif': 'image/gif',
+    '.bmp': 'image/bmp',
+    '.webp': 'image/webp'
+}
+
+
+def _suffix(name: str) -> str:
+    """Lower-case extension of the last path component ('' if none); a cheap Path(name).suffix.lower().
+
+    Both '/' (URLs) and the platform separator (e.g. '\\' on Windows) end a component.
+    """
+    i = name.rfind('.')
+    return name[i:].lower() if i > max(name.rfind('/'), name.rfind(os.sep)) else ''
+
+
+@lru_cache(maxsize=8192)
+def _ext_from_url(url: str) -> str:
+    """Image extension of a URL's path, '.jpg' if missing or not an image type."""
+    extension = _suffix(urlparse(url).path)
+    
+    if extension not in _IMAGE_EXTS:
+        extension = '.jpg'
+    return extension
+
 
 class StreamlinedImageProcessor:
     """Downloads images and replaces logos in one streamlined process."""
-    
+
+    # Old logo scales tried by template matching and by the corner fallback
+    TEMPLATE_SCALES = [0.4, 0.5, 0.6, 0.75, 1.0, 1.25, 1.5]
+    CORNER_SCALES = [1.0, 0.5, 0.75, 1.25]
+
+    # Template matching method and the similarity a match must exceed.
+    # TM_CCOEFF_NORMED is kept over TM_CCORR_NORMED: both use the same DFT
+    # correlation inside OpenCV, but CCORR scores logo-free images ~0.86-0.88
+    # and off-scale logos ~0.87-0.91, leaving no usable threshold.
+    MATCH_METHOD = cv2.TM_CCOEFF_NORMED
+    MATCH_THRESHOLD = 0.5
+    CORNER_MATCH_THRESHOLD = 0.6
+
+    # The corner fallback only runs when the full-image score is within this
+    # margin below MATCH_THRESHOLD (the pyramid search may underestimate a
+    # corner logo), and ignores templates smaller than this many pixels
+    CORNER_SEARCH_MARGIN = 0.1
+    MIN_CORNER_TEMPLATE_AREA = 256
+
+    # Coarse-to-fine matching: number of pyramid levels, smallest template side
+    # allowed at the coarsest level, and the search window (pixels) when refining
+    PYRAMID_LEVELS = 3
+    PYRAMID_MIN_TEMPLATE_SIDE = 8
+    PYRAMID_REFINE_MARGIN = 4
+
+    # Image download timeouts in seconds: (connect, read between bytes)
+    DOWNLOAD_TIMEOUT = (10, 30)
+
+    # Files below this size go to S3 in a single put_object request instead of
+    # through the transfer manager
+    SMALL_UPLOAD_MAX_BYTES = 1024 * 1024
+
+    # Image URL updates are committed in batches of this many rows, so a failure
+    # late in a run does not roll back the updates before it
+    DB_UPDATE_BATCH_SIZE = 100
+
+    # MySQL connections kept open by the pool; all DB access runs on the main
+    # thread one call at a time, so a single spare connection is enough
+    DB_POOL_SIZE = 2
+
     def __init__(self):
         """Initialize the processor."""
         # Database configuration
@@ -55,9 +145,26 @@ class StreamlinedImageProcessor:
             'aws_secret_access_key': os.getenv('AWS_SECRET_ACCESS_KEY'),
             'region_name': os.getenv('AWS_REGION', 'us-east-1'),
             'bucket_name': os.getenv('S3_BUCKET_NAME'),
-            'folder_prefix': os.getenv('S3_FOLDER_PREFIX', 'processed-images/')
+            'folder_prefix': os.getenv('S3_FOLDER_PREFIX', 'processed-images/'),
+            # Number of files uploaded in parallel
+            'upload_concurrency': int(os.getenv('S3_UPLOAD_CONCURRENCY', '16'))
         }
         
+        # Public URL prefix of uploaded objects - standard format for us-east-1, regional for others
+        if self.s3_config['region_name'] == 'us-east-1':
+            self._s3_url_prefix = f"https://{self.s3_config['bucket_name']}.s3.amazonaws.com/"
+        else:
+            self._s3_url_prefix = f"https://{self.s3_config['bucket_name']}.s3.{self.s3_config['region_name']}.amazonaws.com/"
+        
+        # Multipart transfer settings: files over 16 MiB are split into 64 MiB
+        # parts that are uploaded in parallel; smaller images go up in one PUT
+        self._transfer_config = TransferConfig(
+            multipart_threshold=16 * 1024 * 1024,
+            multipart_chunksize=64 * 1024 * 1024,
+            max_concurrency=10,
+            use_threads=True
+        )
+        
         # Initialize S3 client if credentials are provided
         self.s3_client = None
         if (self.s3_config['aws_access_key_id'] and 
@@ -67,12 +174,23 @@ class StreamlinedImageProcessor:
             self.s3_config['aws_secret_access_key'].strip() and
             self.s3_config['bucket_name'].strip()):
             try:
-                self.s3_client = boto3.client(
-                    's3',
+                # One session and one client are shared by all upload threads
+                # (client calls are thread-safe). Each thread may run
+                # max_concurrency part uploads, so size the connection pool to
+                # keep sockets alive instead of re-doing TLS handshakes.
+                self._s3_session = boto3.session.Session(
                     aws_access_key_id=self.s3_config['aws_access_key_id'],
                     aws_secret_access_key=self.s3_config['aws_secret_access_key'],
                     region_name=self.s3_config['region_name']
                 )
+                self.s3_client = self._s3_session.client(
+                    's3',
+                    config=BotocoreConfig(
+                        max_pool_connections=max(64, self.s3_config['upload_concurrency'] * self._transfer_config.max_concurrency),
+                        retries={'mode': 'adaptive', 'max_attempts': 5},
+                        tcp_keepalive=True
+                    )
+                )
                 # Test the connection by listing buckets (but don't fail if it doesn't work)
                 try:
                     self.s3_client.head_bucket(Bucket=self.s3_config['bucket_name'])
@@ -86,8 +204,31 @@ class StreamlinedImageProcessor:
         else:
             logger.info("ℹ️ S3 credentials not provided - S3 upload will be skipped")
         
+        # Number of images downloaded and processed concurrently. Downloads are
+        # I/O bound and OpenCV releases the GIL, so threads overlap well.
+        self.max_workers = int(os.getenv('MAX_WORKERS', '16'))
+        
+        # One HTTP session for all downloads, with a connection pool large
+        # enough for every worker thread
+        self._http_session = requests.Session()
+        self._http_session.headers['User-Agent'] = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+        http_adapter = requests.adapters.HTTPAdapter(pool_connections=self.max_workers, pool_maxsize=self.max_workers)
+        self._http_session.mount('http://', http_adapter)
+        self._http_session.mount('https://', http_adapter)
+        
+        # matchTemplate backend: CUDA or OpenCL (T-API) when available, else CPU
+        self._match_backend = self._init_match_backend()
+        self._cuda_local = threading.local()
+        
+        # MySQL connection pool, created on first connect_to_database() call
+        self._db_pool = None
+        self._db_pool_lock = threading.Lock()
+        
         # Paths
         self.download_dir = Path('processed_images')
+        # Paths found under download_dir start with it plus a separator; slicing
+        # that off gives the relative path used in the S3 key
+        self._download_dir_prefix_len = len(str(self.download_dir).rstrip(os.sep)) + 1
         self.old_logo_path = Path('logo.webp')
         self.new_logo_path = Path('1753103783318.jpeg')
         
@@ -101,9 +242,39 @@ class StreamlinedImageProcessor:
         self.old_logo = Image.open(self.old_logo_path).convert('RGBA')
         self.new_logo = Image.open(self.new_logo_path).convert('RGBA')
         
+        # The old logo never changes, so build its BGR templates once for every scale
+        self._old_logo_bgr = cv2.cvtColor(np.array(self.old_logo.convert('RGB')), cv2.COLOR_RGB2BGR)
+        self._old_logo_bgr_by_scale = {}
+        for scale in self.TEMPLATE_SCALES + self.CORNER_SCALES:
+            width = int(self.old_logo.width * scale)
+            height = int(self.old_logo.height * scale)
+            if scale in self._old_logo_bgr_by_scale or width <= 0 or height <= 0:
+                continue
+            if (width, height) == self.old_logo.size:
+                self._old_logo_bgr_by_scale[scale] = self._old_logo_bgr
+            else:
+                self._old_logo_bgr_by_scale[scale] = self._resize_template(self._old_logo_bgr, width, height)
+        
+        # Pyramid levels of every template for coarse-to-fine matching, plus a
+        # copy kept on the GPU/OpenCL device so it is uploaded only once
+        self._old_logo_pyramids = {}
+        self._device_old_logo_pyramids = {}
+        for scale, template in self._old_logo_bgr_by_scale.items():
+            pyramid = [template]
+            for _ in range(self.PYRAMID_LEVELS):
+                pyramid.append(cv2.pyrDown(pyramid[-1]))
+            self._old_logo_pyramids[scale] = pyramid
+            self._device_old_logo_pyramids[scale] = [self._to_match_device(level) for level in pyramid]
+
         logger.info(f"Old logo loaded: {self.old_logo_path} (Size: {self.old_logo.size})")
         logger.info(f"New logo loaded: {self.new_logo_path} (Size: {self.new_logo.size})")
     
+    @staticmethod
+    def _resize_template(image_bgr: np.ndarray, width: int, height: int) -> np.ndarray:
+        """Resize a BGR template: INTER_AREA when shrinking, INTER_CUBIC when enlarging."""
+        interpolation = cv2.INTER_AREA if width < image_bgr.shape[1] else cv2.INTER_CUBIC
+        return cv2.resize(image_bgr, (width, height), interpolation=interpolation)
+    
     def cleanup_old_data(self):
         """Remove all old processed images and logs."""
         logger.info("Cleaning up old data...")
@@ -131,17 +302,35 @@ class StreamlinedImageProcessor:
         logger.info("Cleanup completed")
     
     def connect_to_database(self):
-        """Connect to MySQL database."""
+        """Get a MySQL connection from the shared pool (close() returns it to the pool)."""
         try:
-            connection = mysql.connector.connect(**self.db_config)
-            logger.info("Successfully connected to MySQL database")
-            return connection
+            # Create the pool on first use so the processor can start without a database
+            with self._db_pool_lock:
+                if self._db_pool is None:
+                    self._db_pool = mysql.connector.pooling.MySQLConnectionPool(
+                        pool_name='image_processor',
+                        pool_size=self.DB_POOL_SIZE,
+                        **self.db_config
+                    )
+                    logger.info("Successfully connected to MySQL database")
+            return self._db_pool.get_connection()
         except mysql.connector.Error as e:
             logger.error(f"Error connecting to MySQL: {e}")
             raise
     
     def update_image_url_in_db(self, section_id: int, old_url: str, new_url: str):
         """Update the image URL in the database for a given section and old URL."""
+        self.update_image_urls_in_db([(section_id, old_url, new_url)])
+    
+    def update_image_urls_in_db(self, updates: List[Tuple[int, str, str]]):
+        """Write (section_id, old_url, new_url) image URL updates, committing every DB_UPDATE_BATCH_SIZE rows.
+
+        A batch that fails is rolled back and retried row by row, so a bad row
+        only loses its own update instead of everything after it.
+        """
+        if not updates:
+            return
+        
         connection = None
         cursor = None
         try:
@@ -155,17 +344,41 @@ class StreamlinedImageProcessor:
                 SET content = REPLACE(content, %s, %s)
                 WHERE id = %s
             """
-            cursor.execute(update_query, (old_url, new_url, section_id))
-            affected_rows = cursor.rowcount
-            connection.commit()
+            updated = 0
+            failed = 0
+            affected_rows = 0
+            for start in range(0, len(updates), self.DB_UPDATE_BATCH_SIZE):
+                batch = updates[start:start + self.DB_UPDATE_BATCH_SIZE]
+                try:
+                    cursor.executemany(update_query, [(old_url, new_url, section_id) for section_id, old_url, new_url in batch])
+                    affected_rows += cursor.rowcount
+                    connection.commit()
+                    updated += len(batch)
+                    continue
+                except Exception as e:
+                    logger.warning(f"⚠️ DB update of {len(batch)} image URLs failed, retrying one by one: {e}")
+                    connection.rollback()
+                
+                for section_id, old_url, new_url in batch:
+                    try:
+                        cursor.execute(update_query, (old_url, new_url, section_id))
+                        affected_rows += cursor.rowcount
+                        connection.commit()
+                        updated += 1
+                    except Exception as e:
+                        failed += 1
+                        logger.error(f"❌ Failed to update DB for section {section_id} ({old_url}): {e}")
+                        connection.rollback()
             
             if affected_rows > 0:
-                logger.info(f"✅ Updated DB: section {section_id} | {old_url} -> {new_url}")
-            else:
-                logger.warning(f"⚠️ No rows updated for section {section_id} - URL might not exist: {old_url}")
+                logger.info(f"✅ Updated DB: {updated} image URLs ({affected_rows} rows changed)")
+            elif updated:
+                logger.warning(f"⚠️ No rows updated for {updated} image URLs - URLs might not exist")
+            if failed:
+                logger.error(f"❌ {failed} of {len(updates)} image URL updates failed")
                 
         except Exception as e:
-            logger.error(f"❌ Failed to update DB for section {section_id}: {e}")
+            logger.error(f"❌ Failed to update DB for {len(updates)} image URLs: {e}")
             if connection:
                 connection.rollback()
         finally:
@@ -209,7 +422,8 @@ class StreamlinedImageProcessor:
             if not content:
                 return []
                 
-            content_data = json.loads(content)
+            # str, bytes and bytearray are all accepted as-is (no decode round-trip)
+            content_data = json_loads(content)
             
             if not isinstance(content_data, list):
                 content_data = [content_data]
@@ -230,7 +444,11 @@ class StreamlinedImageProcessor:
             return []
     
     def download_image(self, url: str, filename: str, subfolder: str = ''):
-        """Download image from URL."""
+        """Download image from URL.
+
+        Returns (local_path, buffer) where buffer holds the downloaded bytes in
+        memory, or False if the download failed.
+        """
         try:
             if subfolder:
                 download_path = self.download_dir / subfolder
@@ -240,41 +458,133 @@ class StreamlinedImageProcessor:
             
             full_path = download_path / filename
             
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            }
-            
-            response = requests.get(url, headers=headers, timeout=30, stream=True)
-            response.raise_for_status()
+            # The shared session keeps connections alive per host across downloads
+            with self._http_session.get(url, timeout=self.DOWNLOAD_TIMEOUT, stream=True) as response:
+                response.raise_for_status()
+                
+                content_type = response.headers.get('content-type', '')
+                if not content_type.startswith('image/'):
+                    logger.warning(f"URL does not point to an image: {url}")
+                    return False
+                
+                # Keep the bytes in memory so logo replacement can decode them directly
+                image_buffer = io.BytesIO()
+                for chunk in response.iter_content(chunk_size=65536):
+                    image_buffer.write(chunk)
             
-            content_type = response.headers.get('content-type', '')
-            if not content_type.startswith('image/'):
-                logger.warning(f"URL does not point to an image: {url}")
+            # Verify the image from its header only; it is fully decoded once later
+            image_format = self._detect_image_format(image_buffer.getbuffer()[:12])
+            if not image_format:
+                logger.warning(f"Downloaded data is not a supported image format: {url}")
                 return False
             
+            # The original is still saved so images without the old logo get uploaded too
             with open(full_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
-            
-            # Verify the image
-            with Image.open(full_path) as img:
-                img.verify()
+                f.write(image_buffer.getbuffer())
             
             logger.info(f"Downloaded: {full_path}")
-            return str(full_path)
+            return str(full_path), image_buffer
                 
         except Exception as e:
             logger.error(f"Error downloading image from {url}: {e}")
             return False
     
-    def find_empty_space_for_logo(self, image: Image.Image, logo_size: tuple, avoid_regions: list = None):
-        """Find an appropriate empty space to place the new logo."""
-        img_width, img_height = image.size
+    @staticmethod
+    def _detect_image_format(header) -> Optional[str]:
+        """Identify an image format from its first 12 bytes (magic numbers)."""
+        header = bytes(header)
+        if header.startswith(b'\xff\xd8\xff'):
+            return 'JPEG'
+        if header.startswith(b'\x89PNG\r\n\x1a\n'):
+            return 'PNG'
+        if header[:6] in (b'GIF87a', b'GIF89a'):
+            return 'GIF'
+        if header.startswith(b'BM'):
+            return 'BMP'
+        if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+            return 'WEBP'
+        return None
+    
+    def _decode_image(self, data) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+        """Decode image bytes into a BGR array plus its alpha channel (if any)."""
+        image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_UNCHANGED)
+        
+        if image is None:
+            # Formats OpenCV cannot decode (e.g. GIF) go through PIL instead
+            try:
+                with Image.open(io.BytesIO(data)) as pil_image:
+                    if pil_image.mode in ('RGB', 'L') and 'transparency' not in pil_image.info:
+                        image = cv2.cvtColor(np.array(pil_image.convert('RGB')), cv2.COLOR_RGB2BGR)
+                    else:
+                        image = cv2.cvtColor(np.array(pil_image.convert('RGBA')), cv2.COLOR_RGBA2BGRA)
+            except Exception:
+                return None, None
+        
+        if image.dtype != np.uint8:
+            image = cv2.convertScaleAbs(image, alpha=255.0 / 65535.0)
+        
+        if image.ndim == 2:
+            return cv2.cvtColor(image, cv2.COLOR_GRAY2BGR), None
+        if image.shape[2] == 4:
+            alpha = image[:, :, 3]
+            # An alpha channel that is opaque everywhere carries no information
+            if alpha.min() == 255:
+                return cv2.cvtColor(image, cv2.COLOR_BGRA2BGR), None
+            return cv2.cvtColor(image, cv2.COLOR_BGRA2BGR), alpha.copy()
+        return image, None
+    
+    def _save_image(self, image_path: str, image_bgr: np.ndarray, alpha: Optional[np.ndarray] = None):
+        """Encode a BGR array (plus optional alpha) to image_path based on its extension."""
+        extension = Path(image_path).suffix.lower() or '.jpg'
+        
+        # Keep transparency only for formats that can store it
+        if alpha is not None and extension in ('.png', '.webp'):
+            image = np.dstack((image_bgr, alpha))
+        else:
+            image = image_bgr
+        
+        # Baseline JPEG without the extra Huffman optimisation pass. PNG keeps
+        # OpenCV's default (level 1 + RLE strategy), its fastest setting.
+        if extension in ('.jpg', '.jpeg'):
+            params = [cv2.IMWRITE_JPEG_QUALITY, 95, cv2.IMWRITE_JPEG_OPTIMIZE, 0, cv2.IMWRITE_JPEG_PROGRESSIVE, 0]
+        elif extension == '.webp':
+            params = [cv2.IMWRITE_WEBP_QUALITY, 95]
+        else:
+            params = []
+        
+        # imencode + write_bytes instead of imwrite so non-ASCII paths work on Windows
+        try:
+            success, encoded = cv2.imencode(extension, image, params)
+        except cv2.error:
+            success = False
+        
+        if success:
+            Path(image_path).write_bytes(encoded.tobytes())
+        else:
+            # Formats OpenCV cannot encode (e.g. GIF) go through PIL instead
+            conversion = cv2.COLOR_BGRA2RGBA if image.shape[2] == 4 else cv2.COLOR_BGR2RGB
+            Image.fromarray(cv2.cvtColor(image, conversion)).save(image_path)
+    
+    def find_empty_space_for_logo(self, image: np.ndarray, logo_size: tuple, avoid_regions: list = None,
+                                  image_gray: Optional[np.ndarray] = None):
+        """Find an appropriate empty space to place the new logo.
+
+        image is a BGR array or a PIL image. Callers that already hold a
+        grayscale copy of it can pass it as image_gray to skip the conversion.
+        """
         logo_width, logo_height = logo_size
         
-        # Convert image to grayscale for analysis
-        gray_image = image.convert('L')
-        image_array = np.array(gray_image)
+        # Convert image to grayscale for analysis (OpenCV, same BT.601 weights as
+        # PIL's convert('L')); the summed-area tables give the mean and standard
+        # deviation of any rectangle in O(1)
+        if image_gray is not None:
+            image_array = image_gray
+        elif isinstance(image, Image.Image):
+            image_array = cv2.cvtColor(np.asarray(image.convert('RGB')), cv2.COLOR_RGB2GRAY)
+        else:
+            image_array = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        img_height, img_width = image_array.shape[:2]
+        sum_table, sq_sum_table = cv2.integral2(image_array, sdepth=cv2.CV_64F, sqdepth=cv2.CV_64F)
         
         # Define candidate positions (preference order)
         candidate_positions = [
@@ -293,56 +603,28 @@ class StreamlinedImageProcessor:
         # Regions to avoid (old logo positions)
         avoid_regions = avoid_regions or []
         
-        best_position = None
-        best_score = -1
-        
-        for position_name, x, y in candidate_positions:
-            # Check if position is within image bounds
-            if x < 0 or y < 0 or x + logo_width > img_width or y + logo_height > img_height:
-                continue
-            
-            # Check if position overlaps with regions to avoid
-            overlaps_avoid_region = False
-            for avoid_x, avoid_y, avoid_w, avoid_h in avoid_regions:
-                if not (x + logo_width <= avoid_x or 
-                       x >= avoid_x + avoid_w or 
-                       y + logo_height <= avoid_y or 
-                       y >= avoid_y + avoid_h):
-                    overlaps_avoid_region = True
-                    break
-            
-            if overlaps_avoid_region:
-                continue
-            
-            # Extract the region where logo would be placed
-            region = image_array[y:y+logo_height, x:x+logo_width]
-            
-            # Calculate "emptiness" score (higher is better)
-            # Look for areas with consistent color/brightness
-            mean_intensity = np.mean(region)
-            std_intensity = np.std(region)
-            
-            # Prefer areas that are:
-            # 1. Not too dark (avoid black areas)
-            # 2. Not too bright (avoid white text areas) 
-            # 3. Have low variation (consistent background)
-            intensity_score = 1.0 - abs(mean_intensity - 128) / 128  # Prefer mid-tones
-            consistency_score = 1.0 - min(std_intensity / 50, 1.0)  # Prefer low variation
-            
-            # Bonus for bottom positions (traditional logo placement)
-            position_bonus = 0.3 if 'bottom' in position_name else 0.0
-            
-            total_score = intensity_score * 0.4 + consistency_score * 0.4 + position_bonus
-            
-            logger.debug(f"Position {position_name} at ({x}, {y}): score {total_score:.3f}")
-            
-            if total_score > best_score:
-                best_score = total_score
-                best_position = (position_name, x, y)
-        
-        if best_position:
-            position_name, x, y = best_position
-            logger.info(f"Selected position: {position_name} at ({x}, {y}) with score {best_score:.3f}")
+        names = [name for name, _, _ in candidate_positions]
+        xs = np.array([x for _, x, _ in candidate_positions])
+        ys = np.array([y for _, _, y in candidate_positions])
+        # Bonus for bottom positions (traditional logo placement)
+        bonuses = np.array([0.3 if 'bottom' in name else 0.0 for name in names])
+        
+        scores = self._score_empty_regions(
+            sum_table, sq_sum_table, xs, ys, bonuses,
+            np.array(avoid_regions, dtype=np.int64).reshape(-1, 4),
+            logo_width, logo_height, img_width, img_height
+        )
+        
+        if logger.isEnabledFor(logging.DEBUG):
+            for name, x, y, score in zip(names, xs, ys, scores):
+                if np.isfinite(score):
+                    logger.debug(f"Position {name} at ({x}, {y}): score {score:.3f}")
+        
+        # argmax keeps the earliest candidate on ties, i.e. the preference order
+        best_index = int(np.argmax(scores))
+        if np.isfinite(scores[best_index]):
+            x, y = int(xs[best_index]), int(ys[best_index])
+            logger.info(f"Selected position: {names[best_index]} at ({x}, {y}) with score {scores[best_index]:.3f}")
             return (x, y)
         
         # Fallback to bottom-left with margin
@@ -350,328 +632,456 @@ class StreamlinedImageProcessor:
         logger.info(f"Using fallback position: bottom-left at ({fallback_x}, {fallback_y})")
         return (fallback_x, fallback_y)
     
-    def remove_old_logo(self, image: Image.Image, logo_position: tuple):
-        """Remove/clear the old logo from its position."""
+    @staticmethod
+    def _region_mean_std(sum_table: np.ndarray, sq_sum_table: np.ndarray, x, y, w: int, h: int):
+        """Mean and standard deviation of rectangles from cv2.integral2 tables.
+
+        x and y may be scalars or arrays of top-left corners of w x h rectangles.
+        """
+        area = w * h
+        region_sum = sum_table[y + h, x + w] - sum_table[y, x + w] - sum_table[y + h, x] + sum_table[y, x]
+        region_sq_sum = sq_sum_table[y + h, x + w] - sq_sum_table[y, x + w] - sq_sum_table[y + h, x] + sq_sum_table[y, x]
+        mean = region_sum / area
+        variance = np.maximum(region_sq_sum / area - mean * mean, 0.0)
+        return mean, np.sqrt(variance)
+    
+    def _score_empty_regions(self, sum_table: np.ndarray, sq_sum_table: np.ndarray, xs: np.ndarray, ys: np.ndarray,
+                             bonuses: np.ndarray, avoid_regions: np.ndarray, logo_width: int, logo_height: int,
+                             img_width: int, img_height: int) -> np.ndarray:
+        """Score every candidate logo position at once; unusable positions score -inf."""
+        scores = np.full(len(xs), -np.inf)
+        
+        # Check if position is within image bounds
+        usable = (xs >= 0) & (ys >= 0) & (xs + logo_width <= img_width) & (ys + logo_height <= img_height)
+        
+        # Check if position overlaps with regions to avoid (candidates x avoid regions)
+        if len(avoid_regions):
+            avoid_x, avoid_y, avoid_w, avoid_h = (avoid_regions[:, i] for i in range(4))
+            overlaps = ~((xs[:, None] + logo_width <= avoid_x) |
+                         (xs[:, None] >= avoid_x + avoid_w) |
+                         (ys[:, None] + logo_height <= avoid_y) |
+                         (ys[:, None] >= avoid_y + avoid_h))
+            usable &= ~overlaps.any(axis=1)
+        
+        if not usable.any():
+            return scores
+        
+        # Calculate "emptiness" score (higher is better)
+        # Look for areas with consistent color/brightness
+        mean_intensity, std_intensity = self._region_mean_std(
+            sum_table, sq_sum_table, xs[usable], ys[usable], logo_width, logo_height
+        )
+        
+        # Prefer areas that are:
+        # 1. Not too dark (avoid black areas)
+        # 2. Not too bright (avoid white text areas) 
+        # 3. Have low variation (consistent background)
+        intensity_score = 1.0 - np.abs(mean_intensity - 128) / 128  # Prefer mid-tones
+        consistency_score = 1.0 - np.minimum(std_intensity / 50, 1.0)  # Prefer low variation
+        
+        scores[usable] = intensity_score * 0.4 + consistency_score * 0.4 + bonuses[usable]
+        return scores
+    
+    def remove_old_logo(self, image: np.ndarray, logo_position: tuple):
+        """Remove/clear the old logo from its position (modifies the BGR array in place)."""
         x, y, w, h = logo_position
-        
-        # Create a copy to work with
-        result_image = image.copy()
-        
-        # Extract the old logo region
-        logo_region = image.crop((x, y, x + w, y + h))
+        img_height, img_width = image.shape[:2]
         
         # Try to fill with surrounding background color
         # Sample colors from around the logo area (expanding outward)
         margin = 10
-        sample_regions = []
+        channels = image.shape[2]
+        samples = []
         
         # Sample from left, right, top, bottom of logo
         if x - margin >= 0:
-            sample_regions.append((x - margin, y, margin, h))  # Left
-        if x + w + margin <= image.width:
-            sample_regions.append((x + w, y, margin, h))  # Right
+            samples.append(image[y:y + h, x - margin:x])  # Left
+        if x + w + margin <= img_width:
+            samples.append(image[y:y + h, x + w:x + w + margin])  # Right
         if y - margin >= 0:
-            sample_regions.append((x, y - margin, w, margin))  # Top
-        if y + h + margin <= image.height:
-            sample_regions.append((x, y + h, w, margin))  # Bottom
-        
-        # Calculate average background color
-        if sample_regions:
-            all_pixels = []
-            for sx, sy, sw, sh in sample_regions:
-                sample = image.crop((sx, sy, sx + sw, sy + sh))
-                sample_array = np.array(sample)
-                all_pixels.extend(sample_array.reshape(-1, sample_array.shape[-1]))
-            
-            if all_pixels:
-                avg_color = tuple(map(int, np.mean(all_pixels, axis=0)))
-            else:
-                avg_color = (255, 255, 255)  # White fallback
+            samples.append(image[y - margin:y, x:x + w])  # Top
+        if y + h + margin <= img_height:
+            samples.append(image[y + h:y + h + margin, x:x + w])  # Bottom
+        
+        # Calculate average background color from per-strip sums (no copies)
+        sample_count = sum(sample.shape[0] * sample.shape[1] for sample in samples)
+        if sample_count:
+            sample_sum = sum(sample.sum(axis=(0, 1), dtype=np.float64) for sample in samples)
+            avg_color = (sample_sum / sample_count).astype(np.uint8)
         else:
-            avg_color = (255, 255, 255)  # White fallback
+            avg_color = np.full(channels, 255, dtype=np.uint8)  # White fallback
         
-        # Fill the old logo area with background color
-        from PIL import ImageDraw
-        draw = ImageDraw.Draw(result_image)
-        draw.rectangle([x, y, x + w, y + h], fill=avg_color)
+        # Fill the old logo area (edges inclusive) with background color
+        image[y:y + h + 1, x:x + w + 1] = avg_color
         
-        logger.info(f"Removed old logo from ({x}, {y}) and filled with color {avg_color}")
-        return result_image
+        logger.info(f"Removed old logo from ({x}, {y}) and filled with BGR color {tuple(avg_color.tolist())}")
+        return image
+    
+    def _paste_new_logo(self, image: np.ndarray, alpha: Optional[np.ndarray], position: tuple, size: tuple):
+        """Alpha-blend the resized new logo into the BGR array (and alpha channel) in place."""
+        x, y = position
+        width, height = size
+        img_height, img_width = image.shape[:2]
+        
+        # Only the small logo goes through PIL; the page itself stays a BGR array
+        new_logo_resized = self.new_logo.resize((width, height), Image.Resampling.LANCZOS)
+        logo_bgra = cv2.cvtColor(np.array(new_logo_resized), cv2.COLOR_RGBA2BGRA)
+        
+        # Clip to the image bounds like PIL's paste does
+        x0, y0 = max(0, x), max(0, y)
+        x1, y1 = min(img_width, x + width), min(img_height, y + height)
+        if x1 <= x0 or y1 <= y0:
+            return image
+        logo_bgra = logo_bgra[y0 - y:y1 - y, x0 - x:x1 - x]
+        
+        roi = image[y0:y1, x0:x1]
+        if logo_bgra[:, :, 3].min() == 255:
+            # Fully opaque logo: plain copy, no blending needed
+            roi[:] = logo_bgra[:, :, :3]
+            if alpha is not None:
+                alpha[y0:y1, x0:x1] = 255
+            return image
+        
+        mask = logo_bgra[:, :, 3:4].astype(np.float32) / 255.0
+        roi[:] = (roi * (1.0 - mask) + logo_bgra[:, :, :3] * mask + 0.5).astype(np.uint8)
+        
+        if alpha is not None:
+            alpha_roi = alpha[y0:y1, x0:x1]
+            alpha_roi[:] = (alpha_roi * (1.0 - mask[:, :, 0]) + logo_bgra[:, :, 3] * mask[:, :, 0] + 0.5).astype(np.uint8)
+        
+        return image
+    
+    def _init_match_backend(self) -> str:
+        """Pick the matchTemplate backend ('cuda', 'opencl' or 'cpu').
 
-    def find_and_replace_logo(self, image_path: str, threshold: float = 0.5):
-        """Find old logo in image and replace with new logo in appropriate location."""
-        try:
-            # Load the main image
-            with Image.open(image_path) as main_image:
-                main_image = main_image.convert('RGBA')
-                
-                # Convert to OpenCV format for template matching
-                image_cv = cv2.cvtColor(np.array(main_image.convert('RGB')), cv2.COLOR_RGB2BGR)
-                template_cv = cv2.cvtColor(np.array(self.old_logo.convert('RGB')), cv2.COLOR_RGB2BGR)
-                
-                best_match = None
-                best_similarity = 0
-                best_scale = 1.0
-                
-                # Try multiple scales since logo might be different size
-                scales = [0.4, 0.5, 0.6, 0.75, 1.0, 1.25, 1.5]
-                
-                for scale in scales:
-                    new_width = int(self.old_logo.width * scale)
-                    new_height = int(self.old_logo.height * scale)
-                    
-                    if new_width > 10 and new_height > 10 and new_width < main_image.width and new_height < main_image.height:
-                        # Scale the template
-                        scaled_logo = self.old_logo.resize((new_width, new_height), Image.Resampling.LANCZOS)
-                        scaled_template_cv = cv2.cvtColor(np.array(scaled_logo.convert('RGB')), cv2.COLOR_RGB2BGR)
-                        
-                        # Perform template matching
-                        result = cv2.matchTemplate(image_cv, scaled_template_cv, cv2.TM_CCOEFF_NORMED)
-                        _, max_val, _, max_loc = cv2.minMaxLoc(result)
-                        
-                        if max_val > best_similarity:
-                            best_similarity = max_val
-                            best_match = (max_loc[0], max_loc[1], new_width, new_height)
-                            best_scale = scale
-                
-                logger.info(f"Best match: similarity {best_similarity:.3f} at scale {best_scale}")
-                
-                positions = []
-                if best_similarity > threshold and best_match:
-                    positions = [best_match]
-                    logger.info(f"Template matching found logo with similarity {best_similarity:.3f}")
-                
-                # Only try corner detection if template matching found nothing good
-                if not positions:
-                    logo_position = self._find_logo_in_corners(main_image, strict_threshold=0.6)
-                    if logo_position:
-                        positions = [logo_position]
-                        logger.info("Corner detection found logo")
-                
-                if not positions:
-                    logger.info(f"No old logo found in: {image_path}")
-                    return False
-                
-                # Process each found logo position
-                result_image = main_image.copy()
-                logo_replaced = False
-                
-                for old_x, old_y, old_w, old_h in positions:
-                    # Step 1: Remove the old logo by filling with background
-                    result_image = self.remove_old_logo(result_image, (old_x, old_y, old_w, old_h))
-                    
-                    # Step 2: Calculate new logo size while preserving aspect ratio
-                    new_width, new_height = self.new_logo.size
-                    new_aspect_ratio = new_width / new_height
-                    
-                    # Use a reasonable size for the new logo (not necessarily same as old logo)
-                    target_width = min(200, main_image.width // 8)  # Max 200px or 1/8 of image width
-                    target_height = int(target_width / new_aspect_ratio)
-                    
-                    # Step 3: Find appropriate empty space for new logo
-                    # Avoid the old logo position
-                    avoid_regions = [(old_x, old_y, old_w, old_h)]
-                    new_x, new_y = self.find_empty_space_for_logo(result_image, (target_width, target_height), avoid_regions)
-                    
-                    # Step 4: Resize and place new logo
-                    new_logo_resized = self.new_logo.resize((target_width, target_height), Image.Resampling.LANCZOS)
-                    
-                    # Paste new logo at the selected position
-                    result_image.paste(new_logo_resized, (new_x, new_y), new_logo_resized)
-                    
-                    logger.info(f"Removed old logo from ({old_x}, {old_y}) and placed new logo at ({new_x}, {new_y}) with size ({target_width}, {target_height})")
-                    logo_replaced = True
-                
-                if logo_replaced:
-                    # Convert back to original format if needed
-                    original_format = Image.open(image_path).format
-                    if main_image.mode != 'RGBA' and original_format != 'PNG':
-                        result_image = result_image.convert('RGB')
-                    
-                    # Save the result
-                    result_image.save(image_path, quality=95, optimize=True)
-                    return True
-                
-                return False
-                
-        except Exception as e:
-            logger.error(f"Error processing logo replacement in {image_path}: {e}")
-            return False
-                
-    def find_empty_space_for_logo(self, image: Image.Image, logo_size: tuple, avoid_regions: list = None):
-        """Find an appropriate empty space to place the new logo."""
-        img_width, img_height = image.size
-        logo_width, logo_height = logo_size
-        
-        # Convert image to grayscale for analysis
-        gray_image = image.convert('L')
-        image_array = np.array(gray_image)
-        
-        # Define candidate positions (preference order)
-        candidate_positions = [
-            # Bottom corners (most common for logos)
-            ('bottom-left', 20, img_height - logo_height - 20),
-            ('bottom-right', img_width - logo_width - 20, img_height - logo_height - 20),
-            # Top corners  
-            ('top-left', 20, 20),
-            ('top-right', img_width - logo_width - 20, 20),
-            # Bottom center
-            ('bottom-center', (img_width - logo_width) // 2, img_height - logo_height - 20),
-            # Top center
-            ('top-center', (img_width - logo_width) // 2, 20),
-        ]
+        MATCH_BACKEND in the environment can force one; 'auto' (default) uses
+        CUDA if a device is present, then OpenCL, then the CPU.
+        """
+        requested = os.getenv('MATCH_BACKEND', 'auto').strip().lower()
+        
+        if requested in ('auto', 'cuda') and hasattr(cv2, 'cuda') and cv2.cuda.getCudaEnabledDeviceCount() > 0:
+            backend = 'cuda'
+        elif requested in ('auto', 'opencl') and cv2.ocl.haveOpenCL():
+            cv2.ocl.setUseOpenCL(True)
+            backend = 'opencl'
+        else:
+            backend = 'cpu'
         
-        # Regions to avoid (old logo positions)
-        avoid_regions = avoid_regions or []
+        if requested not in ('auto', backend):
+            logger.warning(f"⚠️ MATCH_BACKEND={requested} is not available - using {backend}")
+        logger.info(f"Template matching backend: {backend}")
+        return backend
+    
+    def _to_match_device(self, image: np.ndarray):
+        """Upload an array for the matching backend (GpuMat for CUDA, UMat for OpenCL)."""
+        if self._match_backend == 'cuda':
+            gpu_image = cv2.cuda_GpuMat()
+            gpu_image.upload(image)
+            return gpu_image
+        if self._match_backend == 'opencl':
+            return cv2.UMat(image)
+        return image
+    
+    def _match_template(self, image, template):
+        """Run matchTemplate on the selected backend and return (max_val, max_loc).
+
+        image and template may be numpy arrays or already uploaded with
+        _to_match_device().
+        """
+        if isinstance(image, np.ndarray):
+            image = self._to_match_device(image)
+        if isinstance(template, np.ndarray):
+            template = self._to_match_device(template)
+        
+        if self._match_backend == 'cuda':
+            # CUDA matchers are not shared between worker threads
+            matcher = getattr(self._cuda_local, 'matcher', None)
+            if matcher is None:
+                matcher = cv2.cuda.createTemplateMatching(cv2.CV_8UC3, self.MATCH_METHOD)
+                self._cuda_local.matcher = matcher
+            result = matcher.match(image, template).download()
+        else:
+            result = cv2.matchTemplate(image, template, self.MATCH_METHOD)
         
-        best_position = None
-        best_score = -1
+        _, max_val, _, max_loc = cv2.minMaxLoc(result)
+        return max_val, max_loc
+    
+    def _multi_scale_match_fft(self, image: np.ndarray, templates: dict) -> dict:
+        """TM_CCOEFF_NORMED match of several templates against one image via a shared FFT.
+
+        The image spectrum (per channel) and its window sums are computed once;
+        each template then only needs its own DFT, a spectrum product and one
+        inverse DFT. Returns {scale: (max_val, max_loc)} like _match_template().
+        """
+        img_h, img_w, channels = image.shape
+        dft_h, dft_w = cv2.getOptimalDFTSize(img_h), cv2.getOptimalDFTSize(img_w)
+        
+        image_f = image.astype(np.float32)
+        image_spectra = []
+        for c in range(channels):
+            padded = np.zeros((dft_h, dft_w), np.float32)
+            padded[:img_h, :img_w] = image_f[:, :, c]
+            image_spectra.append(cv2.dft(padded))
+        
+        # Per-channel window sums of I and I^2 give each window's variance term
+        sum_table, sq_sum_table = cv2.integral2(image, sdepth=cv2.CV_64F, sqdepth=cv2.CV_64F)
+        
+        matches = {}
+        for scale, template in templates.items():
+            tmpl_h, tmpl_w = template.shape[:2]
+            area = tmpl_h * tmpl_w
+            
+            # CCOEFF: correlate with the zero-mean template, so the window mean drops out of the numerator
+            template_zero_mean = template.astype(np.float32) - template.reshape(-1, channels).mean(axis=0)
+            template_norm_sq = float(np.sum(template_zero_mean.astype(np.float64) ** 2))
+            
+            spectrum = None
+            for c in range(channels):
+                padded = np.zeros((dft_h, dft_w), np.float32)
+                padded[:tmpl_h, :tmpl_w] = template_zero_mean[:, :, c]
+                product = cv2.mulSpectrums(image_spectra[c], cv2.dft(padded), 0, conjB=True)
+                spectrum = product if spectrum is None else spectrum + product
+            correlation = cv2.idft(spectrum, flags=cv2.DFT_SCALE | cv2.DFT_REAL_OUTPUT)
+            numerator = correlation[:img_h - tmpl_h + 1, :img_w - tmpl_w + 1].astype(np.float64)
+            
+            window_sum = (sum_table[tmpl_h:, tmpl_w:] - sum_table[:-tmpl_h, tmpl_w:]
+                          - sum_table[tmpl_h:, :-tmpl_w] + sum_table[:-tmpl_h, :-tmpl_w])
+            window_sq_sum = (sq_sum_table[tmpl_h:, tmpl_w:] - sq_sum_table[:-tmpl_h, tmpl_w:]
+                             - sq_sum_table[tmpl_h:, :-tmpl_w] + sq_sum_table[:-tmpl_h, :-tmpl_w])
+            window_var = np.sum(window_sq_sum - window_sum * window_sum / area, axis=2)
+            
+            # Flat windows (or a flat template) have no defined correlation; score them 0
+            denominator = np.sqrt(np.maximum(window_var, 0.0) * template_norm_sq)
+            result = np.zeros_like(numerator)
+            valid = denominator > 1e-6 * area
+            result[valid] = numerator[valid] / denominator[valid]
+            
+            _, max_val, _, max_loc = cv2.minMaxLoc(np.clip(result, -1.0, 1.0))
+            matches[scale] = (max_val, max_loc)
         
-        for position_name, x, y in candidate_positions:
-            # Check if position is within image bounds
-            if x < 0 or y < 0 or x + logo_width > img_width or y + logo_height > img_height:
-                continue
+        return matches
+    
+    def _pyramid_match(self, image_cv: np.ndarray, scales: list, levels: int = None):
+        """Coarse-to-fine template matching over an image pyramid.
+
+        Every cached old-logo template in scales is matched against the coarsest
+        pyramid level only; each candidate is then refined level by level inside
+        a small window around the upscaled position. Returns
+        ((x, y, w, h), similarity, scale) in level-0 coordinates, or
+        (None, 0, 1.0) if no template fits the image.
+        """
+        if not scales:
+            return None, 0, 1.0
+        if levels is None:
+            levels = self.PYRAMID_LEVELS
+
+        # Keep the smallest template usable at the coarsest level
+        min_template_side = min(min(self._old_logo_pyramids[scale][0].shape[:2]) for scale in scales)
+        while levels > 0 and (min_template_side >> levels) < self.PYRAMID_MIN_TEMPLATE_SIDE:
+            levels -= 1
+
+        image_pyramid = [image_cv]
+        for _ in range(levels):
+            image_pyramid.append(cv2.pyrDown(image_pyramid[-1]))
+        coarse_image = image_pyramid[-1]
+
+        template_pyramids = {}
+        for scale in scales:
+            template_pyramid = self._old_logo_pyramids[scale][:levels + 1]
+            coarse_template = template_pyramid[-1]
+            if coarse_template.shape[0] <= coarse_image.shape[0] and coarse_template.shape[1] <= coarse_image.shape[1]:
+                template_pyramids[scale] = template_pyramid
+
+        # Locate the best candidate for every scale at the coarsest level. On the
+        # CPU all scales share one FFT of the image; GPU backends upload the
+        # coarse image once and match it against the templates kept on the device.
+        if self._match_backend == 'cpu' and self.MATCH_METHOD == cv2.TM_CCOEFF_NORMED:
+            coarse_templates = {scale: pyramid[-1] for scale, pyramid in template_pyramids.items()}
+            coarse_matches = self._multi_scale_match_fft(coarse_image, coarse_templates)
+        else:
+            coarse_device_image = self._to_match_device(coarse_image)
+            coarse_matches = {
+                scale: self._match_template(coarse_device_image, self._device_old_logo_pyramids[scale][levels])
+                for scale in template_pyramids
+            }
+
+        candidates = []
+        for scale, (max_val, max_loc) in coarse_matches.items():
+            candidates.append((scale, template_pyramids[scale], max_loc, max_val))
+
+        best_match = None
+        best_similarity = 0
+        best_scale = 1.0
+
+        # Refine each candidate down to full resolution within a +/- margin window
+        margin = self.PYRAMID_REFINE_MARGIN
+        for scale, template_pyramid, (x, y), similarity in candidates:
+            for level in range(levels - 1, -1, -1):
+                level_image = image_pyramid[level]
+                level_template = template_pyramid[level]
+                template_h, template_w = level_template.shape[:2]
+
+                x0 = max(0, x * 2 - margin)
+                y0 = max(0, y * 2 - margin)
+                x1 = min(level_image.shape[1], x * 2 + template_w + margin)
+                y1 = min(level_image.shape[0], y * 2 + template_h + margin)
+                roi = level_image[y0:y1, x0:x1]
+                if roi.shape[0] < template_h or roi.shape[1] < template_w:
+                    x, y = x * 2, y * 2
+                    continue
+
+                similarity, (dx, dy) = self._match_template(roi, self._device_old_logo_pyramids[scale][level])
+                x, y = x0 + dx, y0 + dy
+
+            if similarity > best_similarity:
+                template_h, template_w = template_pyramid[0].shape[:2]
+                best_similarity = similarity
+                best_match = (x, y, template_w, template_h)
+                best_scale = scale
+
+        return best_match, best_similarity, best_scale
+
+    def find_and_replace_logo(self, image_path: str, threshold: float = MATCH_THRESHOLD, image_buffer: Optional[io.BytesIO] = None):
+        """Find old logo in image and replace with new logo in appropriate location.
+
+        If image_buffer (as returned by download_image) is given, the image is
+        decoded from memory instead of being read back from image_path.
+        Returns True if a logo was replaced, False if not, and None if the image
+        could not be decoded at all.
+        """
+        try:
+            # Load the main image straight into a BGR array
+            if image_buffer is not None:
+                image_data = image_buffer.getbuffer()
+            else:
+                image_data = Path(image_path).read_bytes()
+            image_cv, alpha = self._decode_image(image_data)
+            if image_cv is None:
+                logger.error(f"Could not decode image: {image_path}")
+                return None
+            img_height, img_width = image_cv.shape[:2]
             
-            # Check if position overlaps with regions to avoid
-            overlaps_avoid_region = False
-            for avoid_x, avoid_y, avoid_w, avoid_h in avoid_regions:
-                if not (x + logo_width <= avoid_x or 
-                       x >= avoid_x + avoid_w or 
-                       y + logo_height <= avoid_y or 
-                       y >= avoid_y + avoid_h):
-                    overlaps_avoid_region = True
-                    break
-            
-            if overlaps_avoid_region:
-                continue
+            # Try multiple scales since logo might be different size
+            scales = []
+            for scale in self.TEMPLATE_SCALES:
+                new_height, new_width = self._old_logo_bgr_by_scale[scale].shape[:2]
+                
+                if new_width > 10 and new_height > 10 and new_width < img_width and new_height < img_height:
+                    scales.append(scale)
             
-            # Extract the region where logo would be placed
-            region = image_array[y:y+logo_height, x:x+logo_width]
+            best_match, best_similarity, best_scale = self._pyramid_match(image_cv, scales)
             
-            # Calculate "emptiness" score (higher is better)
-            # Look for areas with consistent color/brightness
-            mean_intensity = np.mean(region)
-            std_intensity = np.std(region)
+            logger.info(f"Best match: similarity {best_similarity:.3f} at scale {best_scale}")
             
-            # Prefer areas that are:
-            # 1. Not too dark (avoid black areas)
-            # 2. Not too bright (avoid white text areas) 
-            # 3. Have low variation (consistent background)
-            intensity_score = 1.0 - abs(mean_intensity - 128) / 128  # Prefer mid-tones
-            consistency_score = 1.0 - min(std_intensity / 50, 1.0)  # Prefer low variation
+            positions = []
+            if best_similarity > threshold and best_match:
+                positions = [best_match]
+                logger.info(f"Template matching found logo with similarity {best_similarity:.3f}")
             
-            # Bonus for bottom positions (traditional logo placement)
-            position_bonus = 0.3 if 'bottom' in position_name else 0.0
+            # Only try corner detection if template matching found nothing good
+            if not positions:
+                logo_position = self._find_logo_in_corners(
+                    image_cv, strict_threshold=self.CORNER_MATCH_THRESHOLD, search_similarity=best_similarity
+                )
+                if logo_position:
+                    positions = [logo_position]
+                    logger.info("Corner detection found logo")
             
-            total_score = intensity_score * 0.4 + consistency_score * 0.4 + position_bonus
+            if not positions:
+                logger.info(f"No old logo found in: {image_path}")
+                return False
             
-            logger.debug(f"Position {position_name} at ({x}, {y}): score {total_score:.3f}")
+            # Process each found logo position (the decoded array is ours to modify).
+            # The grayscale copy is converted once and patched after each edit.
+            result_image = image_cv
+            image_gray = cv2.cvtColor(result_image, cv2.COLOR_BGR2GRAY)
+            logo_replaced = False
             
-            if total_score > best_score:
-                best_score = total_score
-                best_position = (position_name, x, y)
-        
-        if best_position:
-            position_name, x, y = best_position
-            logger.info(f"Selected position: {position_name} at ({x}, {y}) with score {best_score:.3f}")
-            return (x, y)
-        
-        # Fallback to bottom-left with margin
-        fallback_x, fallback_y = 20, img_height - logo_height - 20
-        logger.info(f"Using fallback position: bottom-left at ({fallback_x}, {fallback_y})")
-        return (fallback_x, fallback_y)
-    
-    def remove_old_logo(self, image: Image.Image, logo_position: tuple):
-        """Remove/clear the old logo from its position."""
-        x, y, w, h = logo_position
-        
-        # Create a copy to work with
-        result_image = image.copy()
-        
-        # Extract the old logo region
-        logo_region = image.crop((x, y, x + w, y + h))
-        
-        # Try to fill with surrounding background color
-        # Sample colors from around the logo area (expanding outward)
-        margin = 10
-        sample_regions = []
-        
-        # Sample from left, right, top, bottom of logo
-        if x - margin >= 0:
-            sample_regions.append((x - margin, y, margin, h))  # Left
-        if x + w + margin <= image.width:
-            sample_regions.append((x + w, y, margin, h))  # Right
-        if y - margin >= 0:
-            sample_regions.append((x, y - margin, w, margin))  # Top
-        if y + h + margin <= image.height:
-            sample_regions.append((x, y + h, w, margin))  # Bottom
-        
-        # Calculate average background color
-        if sample_regions:
-            all_pixels = []
-            for sx, sy, sw, sh in sample_regions:
-                sample = image.crop((sx, sy, sx + sw, sy + sh))
-                sample_array = np.array(sample)
-                all_pixels.extend(sample_array.reshape(-1, sample_array.shape[-1]))
-            
-            if all_pixels:
-                avg_color = tuple(map(int, np.mean(all_pixels, axis=0)))
-            else:
-                avg_color = (255, 255, 255)  # White fallback
-        else:
-            avg_color = (255, 255, 255)  # White fallback
-        
-        # Fill the old logo area with background color
-        from PIL import ImageDraw
-        draw = ImageDraw.Draw(result_image)
-        draw.rectangle([x, y, x + w, y + h], fill=avg_color)
-        
-        logger.info(f"Removed old logo from ({x}, {y}) and filled with color {avg_color}")
-        return result_image
+            for old_x, old_y, old_w, old_h in positions:
+                # Step 1: Remove the old logo by filling with background
+                self.remove_old_logo(result_image, (old_x, old_y, old_w, old_h))
+                removed = (slice(old_y, old_y + old_h + 1), slice(old_x, old_x + old_w + 1))
+                image_gray[removed] = cv2.cvtColor(result_image[removed], cv2.COLOR_BGR2GRAY)
+                if alpha is not None:
+                    alpha[removed] = 255
+                
+                # Step 2: Calculate new logo size while preserving aspect ratio
+                new_width, new_height = self.new_logo.size
+                new_aspect_ratio = new_width / new_height
+                
+                # Use a reasonable size for the new logo (not necessarily same as old logo)
+                target_width = min(200, img_width // 8)  # Max 200px or 1/8 of image width
+                target_height = int(target_width / new_aspect_ratio)
+                
+                # Step 3: Find appropriate empty space for new logo
+                # Avoid the old logo position
+                avoid_regions = [(old_x, old_y, old_w, old_h)]
+                new_x, new_y = self.find_empty_space_for_logo(
+                    result_image, (target_width, target_height), avoid_regions, image_gray=image_gray
+                )
+                
+                # Step 4: Resize and place new logo
+                self._paste_new_logo(result_image, alpha, (new_x, new_y), (target_width, target_height))
+                pasted = (slice(max(0, new_y), max(0, new_y + target_height)), slice(max(0, new_x), max(0, new_x + target_width)))
+                if result_image[pasted].size:
+                    image_gray[pasted] = cv2.cvtColor(result_image[pasted], cv2.COLOR_BGR2GRAY)
+                
+                logger.info(f"Removed old logo from ({old_x}, {old_y}) and placed new logo at ({new_x}, {new_y}) with size ({target_width}, {target_height})")
+                logo_replaced = True
+            
+            if logo_replaced:
+                # Save the result in the format given by the file extension
+                self._save_image(image_path, result_image, alpha)
+                return True
+            
+            return False
+            
+        except Exception as e:
+            logger.error(f"Error processing logo replacement in {image_path}: {e}")
+            return False
     
-    def _find_logo_in_corners(self, image: Image.Image, strict_threshold: float = 0.25):
-        """Try to find logo in common corners with flexible similarity checking."""
-        # Try different sizes for the logo search area
-        logo_sizes = [
-            (self.old_logo.width, self.old_logo.height),  # Original size
-            (int(self.old_logo.width * 0.5), int(self.old_logo.height * 0.5)),  # Half size
-            (int(self.old_logo.width * 0.75), int(self.old_logo.height * 0.75)),  # 3/4 size
-            (int(self.old_logo.width * 1.25), int(self.old_logo.height * 1.25)),  # 1.25x size
-        ]
-        
+    def _find_logo_in_corners(self, image: np.ndarray, strict_threshold: float = 0.25,
+                              search_similarity: Optional[float] = None):
+        """Try to find logo in common corners of a BGR image with flexible similarity checking.
+
+        search_similarity is the score of the full-image search, if one ran. Each
+        corner window is one of the positions that search already scored, so
+        the corners are skipped when it is clearly below MATCH_THRESHOLD.
+        """
+        if search_similarity is not None and search_similarity < self.MATCH_THRESHOLD - self.CORNER_SEARCH_MARGIN:
+            logger.debug(f"Skipping corner search: full-image similarity {search_similarity:.3f}")
+            return None
+        
+        img_height, img_width = image.shape[:2]
         corners = ['bottom-left', 'bottom-right', 'top-left', 'top-right']
         
         best_match = None
         best_similarity = 0
         
-        for w, h in logo_sizes:
-            if w <= 0 or h <= 0:
+        # Try different sizes for the logo search area
+        for scale in self.CORNER_SCALES:
+            if scale not in self._old_logo_bgr_by_scale:
+                continue
+            h, w = self._old_logo_bgr_by_scale[scale].shape[:2]
+            logo_cv = self._device_old_logo_pyramids[scale][0]
+            if w * h < self.MIN_CORNER_TEMPLATE_AREA:
                 continue
                 
             corner_positions = [
-                ('bottom-left', 0, image.height - h, w, h),
-                ('bottom-right', image.width - w, image.height - h, w, h),
+                ('bottom-left', 0, img_height - h, w, h),
+                ('bottom-right', img_width - w, img_height - h, w, h),
                 ('top-left', 0, 0, w, h),
-                ('top-right', image.width - w, 0, w, h)
+                ('top-right', img_width - w, 0, w, h)
             ]
             
             for corner_name, x, y, check_w, check_h in corner_positions:
-                if x >= 0 and y >= 0 and x + check_w <= image.width and y + check_h <= image.height:
+                if x >= 0 and y >= 0 and x + check_w <= img_width and y + check_h <= img_height:
                     # Extract region
-                    region = image.crop((x, y, x + check_w, y + check_h))
+                    region_cv = image[y:y + check_h, x:x + check_w]
                     
                     try:
-                        # Convert both to RGB for comparison
-                        region_rgb = region.convert('RGB')
-                        logo_rgb = self.old_logo.resize((check_w, check_h), Image.Resampling.LANCZOS).convert('RGB')
-                        
-                        # Use OpenCV for template matching on the cropped region
-                        region_cv = cv2.cvtColor(np.array(region_rgb), cv2.COLOR_RGB2BGR)
-                        logo_cv = cv2.cvtColor(np.array(logo_rgb), cv2.COLOR_RGB2BGR)
-                        
                         # Calculate similarity using normalized cross correlation
-                        result = cv2.matchTemplate(region_cv, logo_cv, cv2.TM_CCOEFF_NORMED)
-                        _, max_val, _, _ = cv2.minMaxLoc(result)
+                        max_val, _ = self._match_template(region_cv, logo_cv)
                         
                         if max_val > best_similarity:
                             best_similarity = max_val
@@ -690,67 +1100,50 @@ class StreamlinedImageProcessor:
         
         return None
     
-    def _remove_overlapping_boxes(self, boxes: List[Tuple[int, int, int, int]], 
-                                 overlap_threshold: float = 0.5):
-        """Remove overlapping bounding boxes."""
-        if not boxes:
-            return []
-        
-        # Simple implementation - remove boxes that are too close
-        filtered_boxes = []
-        for box in boxes:
-            x1, y1, w1, h1 = box
-            is_unique = True
-            
-            for existing_box in filtered_boxes:
-                x2, y2, w2, h2 = existing_box
-                
-                # Check if boxes overlap significantly
-                overlap_x = max(0, min(x1 + w1, x2 + w2) - max(x1, x2))
-                overlap_y = max(0, min(y1 + h1, y2 + h2) - max(y1, y2))
-                overlap_area = overlap_x * overlap_y
-                
-                box1_area = w1 * h1
-                box2_area = w2 * h2
-                
-                if overlap_area > overlap_threshold * min(box1_area, box2_area):
-                    is_unique = False
-                    break
-            
-            if is_unique:
-                filtered_boxes.append(box)
-        
-        return filtered_boxes
-    
     def generate_filename(self, url: str, section_id: int, report_id: int, index: int = 0):
         """Generate filename for downloaded image."""
-        from urllib.parse import urlparse
-        
-        parsed_url = urlparse(url)
-        path = parsed_url.path
-        extension = Path(path).suffix.lower()
-        
-        if not extension or extension not in ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp']:
-            extension = '.jpg'
+        extension = _ext_from_url(url)
         
         filename = f"report_{report_id}_section_{section_id}_img_{index}{extension}"
         return filename
     
-    def upload_file_to_s3(self, local_file_path: str, s3_key: str) -> bool:
-        """Upload a single file to S3."""
+    def upload_file_to_s3(self, local_file_path: str, s3_key: str, skip_unchanged: bool = False) -> bool:
+        """Upload a single file to S3.
+
+        With skip_unchanged, the upload is skipped (and counted as done) when
+        s3_key already holds an identical object; this costs a HEAD request per
+        file, which is cheap next to re-sending an unchanged body.
+        """
         if not self.s3_client:
             logger.warning("S3 client not initialized - skipping upload")
             return False
         
         try:
-            # Upload the file
-            self.s3_client.upload_file(
-                local_file_path, 
-                self.s3_config['bucket_name'], 
-                s3_key,
-                ExtraArgs={'ContentType': self._get_content_type(local_file_path)}
-            )
-            logger.info(f"✅ Uploaded to S3: {s3_key}")
+            content_type = self._get_content_type(_suffix(local_file_path))
+            local_size = os.path.getsize(local_file_path)
+            
+            if skip_unchanged and self._s3_object_matches(local_file_path, local_size, s3_key):
+                logger.debug(f"⏭️ Already in S3, skipping upload: {s3_key}")
+                return True
+            
+            if local_size < self.SMALL_UPLOAD_MAX_BYTES:
+                # Small image: one PUT, no transfer manager setup or multipart checks
+                self.s3_client.put_object(
+                    Bucket=self.s3_config['bucket_name'],
+                    Key=s3_key,
+                    Body=Path(local_file_path).read_bytes(),
+                    ContentType=content_type
+                )
+            else:
+                # Upload the file
+                self.s3_client.upload_file(
+                    local_file_path, 
+                    self.s3_config['bucket_name'], 
+                    s3_key,
+                    ExtraArgs={'ContentType': content_type},
+                    Config=self._transfer_config
+                )
+            logger.debug(f"✅ Uploaded to S3: {s3_key}")
             return True
         except ClientError as e:
             logger.error(f"❌ Failed to upload {local_file_path} to S3: {e}")
@@ -759,18 +1152,76 @@ class StreamlinedImageProcessor:
             logger.error(f"❌ Unexpected error uploading {local_file_path}: {e}")
             return False
     
-    def _get_content_type(self, file_path: str) -> str:
-        """Get the appropriate content type for a file."""
-        extension = Path(file_path).suffix.lower()
-        content_types = {
-            '.jpg': 'image/jpeg',
-            '.jpeg': 'image/jpeg', 
-            '.png': 'image/png',
-            '.gif': 'image/gif',
-            '.bmp': 'image/bmp',
-            '.webp': 'image/webp'
-        }
-        return content_types.get(extension, 'application/octet-stream')
+    def _s3_object_matches(self, local_file_path: str, local_size: int, s3_key: str) -> bool:
+        """Check whether s3_key already holds exactly this file (same size and MD5 ETag)."""
+        try:
+            response = self.s3_client.head_object(Bucket=self.s3_config['bucket_name'], Key=s3_key)
+        except ClientError:
+            return False
+        
+        if response.get('ContentLength') != local_size:
+            return False
+        
+        # Multipart uploads have a composite ETag ("<md5 of part md5s>-<parts>")
+        # that can't be compared with the file's MD5
+        etag = response.get('ETag', '').strip('"')
+        if not etag or '-' in etag:
+            return False
+        
+        md5 = hashlib.md5()
+        with open(local_file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                md5.update(chunk)
+        return md5.hexdigest() == etag
+    
+    @staticmethod
+    def _get_content_type(extension: str) -> str:
+        """Get the appropriate content type for a lower-case file extension (e.g. '.png')."""
+        return _CONTENT_TYPES.get(extension, 'application/octet-stream')
+    
+    def _iter_image_files(self, root):
+        """Yield (path, name) for every image file below root.
+
+        Uses os.scandir directly so file types come from the directory listing
+        without extra stat calls; symlinks are not followed. Like os.walk, a
+        missing root yields nothing and unreadable directories are skipped.
+        """
+        root = os.fspath(root)
+        stack = [root]
+        while stack:
+            directory = stack.pop()
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False) and _suffix(entry.name) in _IMAGE_EXTS:
+                            yield entry.path, entry.name
+            except OSError as e:
+                if directory != root or not isinstance(e, FileNotFoundError):
+                    logger.warning(f"⚠️ Skipping unreadable directory {directory}: {e}")
+    
+    def _iter_uploads(self, image_db_map=None):
+        """Yield (local_path, s3_key) for every image to upload.
+
+        With an image_db_map (as built by process_all) its keys are the files to
+        upload, so the download directory is not scanned again; without one
+        every image under the download directory is uploaded.
+        """
+        folder_prefix = self.s3_config['folder_prefix']
+        if image_db_map is not None:
+            # Map keys are realpaths, so slice off the resolved download dir
+            root_len = len(os.path.realpath(self.download_dir).rstrip(os.sep)) + 1
+            local_paths = iter(image_db_map)
+        else:
+            root_len = self._download_dir_prefix_len
+            local_paths = (local_path for local_path, _ in self._iter_image_files(self.download_dir))
+        
+        for local_path in local_paths:
+            relative_path = local_path[root_len:]
+            if os.sep != '/':
+                relative_path = relative_path.replace(os.sep, '/')
+            yield local_path, folder_prefix + relative_path
     
     def upload_processed_images_to_s3(self, image_db_map=None) -> dict:
         """Upload all processed images to S3 and update DB URLs if mapping provided."""
@@ -782,55 +1233,101 @@ class StreamlinedImageProcessor:
 
         logger.info("🔄 Starting S3 upload of processed images...")
 
-        for root, dirs, files in os.walk(self.download_dir):
-            for file in files:
-                if file.lower().endswith(('.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp')):
-                    local_path = os.path.join(root, file)
-                    relative_path = os.path.relpath(local_path, self.download_dir)
-                    s3_key = f"{self.s3_config['folder_prefix']}{relative_path.replace(os.sep, '/')}"
-                    # Upload the file
-                    if self.upload_file_to_s3(local_path, s3_key):
+        # Uploads are network-bound, so run them in parallel on the shared client.
+        # Only a bounded window of uploads is in flight: each completion submits
+        # the next file, so the directory walk overlaps with the uploads and no
+        # future is created per file up front. Results are handled here on the
+        # calling thread, which collects the DB updates and writes them all once
+        # the uploads are done.
+        pending_db_updates = []
+        uploads = self._iter_uploads(image_db_map)
+        upload_concurrency = self.s3_config['upload_concurrency']
+        # Bound once here rather than looked up for every file in the loop
+        upload_file = self.upload_file_to_s3
+        url_prefix = self._s3_url_prefix
+        files = upload_stats['files']
+        with ThreadPoolExecutor(max_workers=upload_concurrency) as executor:
+            submit = executor.submit
+            # Re-runs re-download and re-process the same sources into byte-identical
+            # files, so one HEAD per file is far cheaper than re-sending every body
+            skip_unchanged = True
+            in_flight = {
+                submit(upload_file, local_path, s3_key, skip_unchanged): (local_path, s3_key)
+                for local_path, s3_key in islice(uploads, 2 * upload_concurrency)
+            }
+
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    local_path, s3_key = in_flight.pop(future)
+                    for next_upload in islice(uploads, 1):
+                        in_flight[submit(upload_file, *next_upload, skip_unchanged)] = next_upload
+                    if future.result():
                         upload_stats['uploaded'] += 1
-                        upload_stats['files'].append({
+                        files.append({
                             'local_path': local_path,
                             's3_key': s3_key,
                             'status': 'uploaded'
                         })
                         # If mapping info is available, update DB
                         if image_db_map:
-                            # Try both absolute and normalized paths to find the mapping
-                            abs_local_path = os.path.abspath(local_path)
-                            info = image_db_map.get(abs_local_path) or image_db_map.get(local_path)
-                            
+                            # Uploads come straight from the map's keys
+                            info = image_db_map.get(local_path)
+
                             if info:
                                 section_id, old_url = info['section_id'], info['old_url']
-                                
-                                # Construct S3 URL - use standard format for us-east-1, regional for others
-                                if self.s3_config['region_name'] == 'us-east-1':
-                                    s3_url = f"https://{self.s3_config['bucket_name']}.s3.amazonaws.com/{s3_key}"
-                                else:
-                                    s3_url = f"https://{self.s3_config['bucket_name']}.s3.{self.s3_config['region_name']}.amazonaws.com/{s3_key}"
-                                
-                                logger.info(f"🔄 Updating DB: section {section_id} | {old_url} -> {s3_url}")
-                                self.update_image_url_in_db(section_id, old_url, s3_url)
+
+                                s3_url = url_prefix + s3_key
+                                pending_db_updates.append((section_id, old_url, s3_url))
                             else:
-                                logger.warning(f"⚠️ No DB mapping found for {local_path} or {abs_local_path}")
-                                # Debug: print available mappings
-                                if image_db_map:
-                                    logger.debug(f"Available mappings: {list(image_db_map.keys())}")
-                        else:
-                            logger.debug("No image_db_map provided - skipping DB update")
+                                logger.warning(f"⚠️ No DB mapping found for {local_path}")
                     else:
                         upload_stats['failed'] += 1
-                        upload_stats['files'].append({
+                        files.append({
                             'local_path': local_path,
                             's3_key': s3_key,
                             'status': 'failed'
                         })
 
+        # Write all image URL updates from this run, committed in batches
+        if image_db_map:
+            logger.info(f"🔄 Updating DB with {len(pending_db_updates)} new image URLs")
+        else:
+            logger.debug("No image_db_map provided - skipping DB update")
+        self.update_image_urls_in_db(pending_db_updates)
+
         logger.info(f"📊 S3 Upload Summary: {upload_stats['uploaded']} uploaded, {upload_stats['failed']} failed")
         return upload_stats
     
+    def _process_one_url(self, section_id: int, report_id: int, index: int, url: str):
+        """Download one image and replace its logo.
+
+        Runs on a worker thread; returns (downloaded_path, logo_replaced), with
+        downloaded_path False if the download failed.
+        """
+        filename = self.generate_filename(url, section_id, report_id, index)
+        subfolder = f"by_report/report_{report_id}"
+        
+        # Download image
+        downloaded = self.download_image(url, filename, subfolder)
+        if not downloaded:
+            return False, False
+        downloaded_path, image_buffer = downloaded
+        
+        # Try to replace logo (only if old logo is actually found)
+        logo_replaced = self.find_and_replace_logo(downloaded_path, image_buffer=image_buffer)
+        if logo_replaced is None:
+            # The header looked like an image but the body is truncated/corrupt:
+            # treat it as a failed download so it is never uploaded or linked
+            Path(downloaded_path).unlink(missing_ok=True)
+            return False, False
+        if logo_replaced:
+            logger.info(f"✅ Logo replaced in: {Path(downloaded_path).name}")
+            return downloaded_path, True
+        
+        logger.info(f"ℹ️  No old logo found in: {Path(downloaded_path).name} (skipped logo replacement)")
+        return downloaded_path, False
+    
     def process_all(self, report_id: Optional[int] = None):
         """Complete process: cleanup, download, and replace logos."""
         logger.info("Starting complete image processing workflow")
@@ -856,52 +1353,52 @@ class StreamlinedImageProcessor:
         # Map local image path to DB info for S3 update
         image_db_map = {}
         
-        # Step 3: Process each section
-        for section in sections:
-            section_id = section['id']
-            report_id = section['report_id']
-            heading = section['heading'] or f"Section_{section_id}"
-            content = section['content']
-            
-            # Extract image URLs
-            image_objects = self.extract_image_urls(content)
-            
-            if image_objects:
-                results['sections_with_images'] += 1
-                results['total_images_found'] += len(image_objects)
+        # Step 3: Process each section, downloading and replacing logos in parallel
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {}
+            for section in sections:
+                section_id = section['id']
+                report_id = section['report_id']
+                heading = section['heading'] or f"Section_{section_id}"
+                content = section['content']
+                
+                # Extract image URLs
+                image_objects = self.extract_image_urls(content)
                 
-                logger.info(f"Processing section {section_id} (Report {report_id}): {heading}")
-                logger.info(f"Found {len(image_objects)} images")
+                if image_objects:
+                    results['sections_with_images'] += 1
+                    results['total_images_found'] += len(image_objects)
+                    
+                    logger.info(f"Processing section {section_id} (Report {report_id}): {heading}")
+                    logger.info(f"Found {len(image_objects)} images")
+                    
+                    for idx, img_obj in enumerate(image_objects):
+                        url = img_obj['url']
+                        future = executor.submit(self._process_one_url, section_id, report_id, idx, url)
+                        futures[future] = (section_id, url)
+            
+            for future in as_completed(futures):
+                section_id, url = futures[future]
+                downloaded_path, logo_replaced = future.result()
                 
-                for idx, img_obj in enumerate(image_objects):
-                    url = img_obj['url']
-                    filename = self.generate_filename(url, section_id, report_id, idx)
-                    subfolder = f"by_report/report_{report_id}"
-
-                    # Download image
-                    downloaded_path = self.download_image(url, filename, subfolder)
-
-                    if downloaded_path:
-                        results['successful_downloads'] += 1
-
-                        # Track for S3/DB update
-                        image_db_map[os.path.abspath(downloaded_path)] = {
-                            'section_id': section_id,
-                            'old_url': url
-                        }
-
-                        # Try to replace logo (only if old logo is actually found)
-                        if self.find_and_replace_logo(downloaded_path):
-                            results['logo_replacements'] += 1
-                            results['files_with_logo_replaced'].append(Path(downloaded_path).name)
-                            logger.info(f"✅ Logo replaced in: {Path(downloaded_path).name}")
-                        else:
-                            results['files_without_old_logo'].append(Path(downloaded_path).name)
-                            logger.info(f"ℹ️  No old logo found in: {Path(downloaded_path).name} (skipped logo replacement)")
-
-                        results['processed_files'].append(downloaded_path)
+                if downloaded_path:
+                    results['successful_downloads'] += 1
+                    
+                    # Track for S3/DB update
+                    image_db_map[os.path.realpath(downloaded_path)] = {
+                        'section_id': section_id,
+                        'old_url': url
+                    }
+                    
+                    if logo_replaced:
+                        results['logo_replacements'] += 1
+                        results['files_with_logo_replaced'].append(Path(downloaded_path).name)
                     else:
-                        results['failed_downloads'] += 1
+                        results['files_without_old_logo'].append(Path(downloaded_path).name)
+                    
+                    results['processed_files'].append(downloaded_path)
+                else:
+                    results['failed_downloads'] += 1
         
         # Step 4: Upload processed images to S3 and update DB URLs
         logger.info("🔄 Starting S3 upload...")